@@ -1,24 +1,83 @@
 from fastapi import FastAPI, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional, Dict, List, Any
+from fastapi.responses import ORJSONResponse, Response
+from typing import Optional, Dict, List, Any, Mapping
+from dataclasses import dataclass
+from types import MappingProxyType
+from contextlib import asynccontextmanager
 import httpx
 import asyncio
-import requests
 import os
-from datetime import datetime, timedelta
+from bisect import bisect_left
+import logging
 from dotenv import load_dotenv
-import json
 from geopy.distance import geodesic
+import numpy as np
+import orjson
+from cachetools import TTLCache
 import random
-import hashlib
+import zlib
+import time
 
 # Load environment variables
 load_dotenv()
 
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+NS_PER_HOUR = 3_600_000_000_000
+
+def _iso_from_ns(ns: int) -> str:
+    """Format a UTC epoch time in nanoseconds as an ISO-8601 string"""
+    seconds, remainder = divmod(ns, 1_000_000_000)
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds)) + f".{remainder // 1000:06d}"
+
+def _iso_now() -> str:
+    """Current UTC time as an ISO-8601 string, without building a datetime"""
+    return _iso_from_ns(time.time_ns())
+
+class APIJSONResponse(ORJSONResponse):
+    """orjson response that handles dataclasses natively and defers anything else to FastAPI's encoder"""
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=jsonable_encoder,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+
+@dataclass(slots=True)
+class ForecastEntry:
+    """One hour of a real-data forecast"""
+    hour: int
+    timestamp: str
+    aqi: int
+    aqi_lower: int
+    aqi_upper: int
+    pm25: float
+    category: str
+    health_recommendations: Optional[Mapping[str, Any]] = None
+    real_time_sources: Optional[Dict[str, bool]] = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Manage shared resources for the lifetime of the application"""
+    from data_sources import warm_clients, warm_kernels, close_clients
+
+    # Compile numba kernels at worker boot rather than on the first request
+    warm_kernels()
+    # Prewarm DNS and TLS for upstream APIs before serving requests
+    await warm_clients()
+    yield
+    # Release pooled upstream connections
+    await close_clients()
+
 app = FastAPI(
     title="Air Quality Forecasting API",
     description="Real-time API integrating NASA TEMPO satellite data with ground-based sensors",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=APIJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS middleware for development
@@ -30,10 +89,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Fused air quality by rounded location; repeat lookups within 5 minutes skip the data sources
+_aq_cache = TTLCache(maxsize=4096, ttl=300)
+
+async def get_cached_air_quality(lat: float, lon: float) -> dict:
+    """Get comprehensive air quality, reusing a recent result for nearby coordinates (~1.1 km)
+
+    Results are built from source responses cached for up to 10 minutes, so a cached result
+    can be about 15 minutes old. Results with failed or fallback sources aren't cached.
+    """
+    # Import here to avoid circular imports
+    from data_sources import data_fusion_engine
+    
+    key = (round(lat, 2), round(lon, 2))
+    result = _aq_cache.get(key)
+    if result is None:
+        result = await data_fusion_engine.get_comprehensive_air_quality(lat, lon)
+        # Don't pin estimates from a transient outage; the next request retries the sources
+        if "data_source_errors" not in result and "fallback_sources" not in result:
+            _aq_cache[key] = result
+    return result
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "ok", "timestamp": datetime.utcnow().isoformat()}
+    return {"status": "ok", "timestamp": _iso_now()}
 
 @app.get("/aq/now")
 async def get_current_air_quality(
@@ -45,7 +125,7 @@ async def get_current_air_quality(
     return {
         "lat": lat,
         "lon": lon,
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": _iso_now(),
         "aqi": 65,
         "pm25": 15.5,
         "o3": 45.2,
@@ -63,11 +143,8 @@ async def get_air_quality_forecast(
     """Get air quality forecast integrating NASA TEMPO, OpenAQ, and weather data"""
     try:
         if use_real_data:
-            # Import here to avoid circular imports
-            from data_sources import data_fusion_engine
-            
             # Get comprehensive real-time data
-            real_time_data = await data_fusion_engine.get_comprehensive_air_quality(lat, lon)
+            real_time_data = await get_cached_air_quality(lat, lon)
             
             # Extract current conditions from real data
             current_aqi = real_time_data.get("weather_adjusted_aqi") or real_time_data.get("overall_aqi", 50)
@@ -80,9 +157,11 @@ async def get_air_quality_forecast(
                 current_pm25 = current_aqi * 0.4  # Estimate if not available
             
             # Generate forecast based on real current conditions
-            forecast_data = generate_realistic_forecast(lat, lon, current_aqi, current_pm25, horizon, real_time_data)
+            start_ns = time.time_ns()
+            forecast_data = generate_realistic_forecast(lat, lon, current_aqi, current_pm25, horizon, real_time_data, start_ns)
             
-            return {
+            # Returned as a response so orjson writes the ForecastEntry dataclasses directly
+            return APIJSONResponse({
                 "lat": lat,
                 "lon": lon,
                 "forecast": forecast_data,
@@ -90,14 +169,14 @@ async def get_air_quality_forecast(
                 "model": "tempo_openaq_integrated_v1",
                 "data_sources": real_time_data.get("data_sources", {}),
                 "data_quality": real_time_data.get("data_quality", "unknown"),
-                "generated_at": datetime.utcnow().isoformat()
-            }
+                "generated_at": _iso_from_ns(start_ns)  # Same baseline as the forecast timestamps
+            })
         else:
             # Fallback to mock data
             return generate_mock_forecast(lat, lon, horizon)
             
     except Exception as e:
-        print(f"Real-time data error: {e}")
+        logger.warning("Real-time data error: %s", e)
         # Fallback to mock data if real data fails
         return generate_mock_forecast(lat, lon, horizon)
 
@@ -124,13 +203,11 @@ async def get_detailed_realtime_data(
 ):
     """Get detailed real-time data from all sources (NASA TEMPO, OpenAQ, Weather)"""
     try:
-        from data_sources import data_fusion_engine
-        
-        real_time_data = await data_fusion_engine.get_comprehensive_air_quality(lat, lon)
+        real_time_data = await get_cached_air_quality(lat, lon)
         
         return {
             "status": "success",
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": _iso_now(),
             "location": {"lat": lat, "lon": lon},
             "data": real_time_data
         }
@@ -151,8 +228,6 @@ async def get_regional_aqi_data(
 ):
     """Get AQI data for a regional area with grid points"""
     try:
-        from data_sources import data_fusion_engine
-
         # Calculate grid points within bounds
         lat_step = (north - south) / grid_size
         lon_step = (east - west) / grid_size
@@ -166,7 +241,7 @@ async def get_regional_aqi_data(
 
                 try:
                     # Get AQI data for this grid point
-                    aqi_data = await data_fusion_engine.get_comprehensive_air_quality(lat, lon)
+                    aqi_data = await get_cached_air_quality(lat, lon)
                     aqi_value = aqi_data.get("weather_adjusted_aqi") or aqi_data.get("overall_aqi", 50)
 
                     grid_data.append({
@@ -189,7 +264,7 @@ async def get_regional_aqi_data(
 
         return {
             "status": "success",
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": _iso_now(),
             "bounds": {
                 "north": north,
                 "south": south,
@@ -207,180 +282,158 @@ async def get_regional_aqi_data(
             detail=f"Failed to fetch regional AQI data: {str(e)}"
         )
 
+# Upper AQI bound of each category; a value on a bound belongs to the lower category
+_AQI_BOUNDS = (50, 100, 150, 200, 300)
+_AQI_CATEGORIES = ("Good", "Moderate", "Unhealthy for Sensitive Groups", "Unhealthy", "Very Unhealthy", "Hazardous")
+_AQI_COLORS = (
+    "#00E400",  # Green
+    "#FFFF00",  # Yellow
+    "#FF7E00",  # Orange
+    "#FF0000",  # Red
+    "#8F3F97",  # Purple
+    "#7E0023"   # Maroon
+)
+
 def get_aqi_category(aqi: float) -> str:
-    """Get AQI category based on value"""
-    if aqi <= 50:
-        return "Good"
-    elif aqi <= 100:
-        return "Moderate"
-    elif aqi <= 150:
-        return "Unhealthy for Sensitive Groups"
-    elif aqi <= 200:
-        return "Unhealthy"
-    elif aqi <= 300:
-        return "Very Unhealthy"
-    else:
-        return "Hazardous"
+    """Convert AQI value to EPA category"""
+    return _AQI_CATEGORIES[bisect_left(_AQI_BOUNDS, aqi)]
 
 def get_aqi_color(aqi: float) -> str:
     """Get AQI color based on value"""
-    if aqi <= 50:
-        return "#00E400"  # Green
-    elif aqi <= 100:
-        return "#FFFF00"  # Yellow
-    elif aqi <= 150:
-        return "#FF7E00"  # Orange
-    elif aqi <= 200:
-        return "#FF0000"  # Red
-    elif aqi <= 300:
-        return "#8F3F97"  # Purple
-    else:
-        return "#7E0023"  # Maroon
+    return _AQI_COLORS[bisect_left(_AQI_BOUNDS, aqi)]
+
+# Static AQI reference table, serialized once at import
+_AQI_REFERENCE = {
+    "categories": [
+        {
+            "range": "0-50",
+            "level": "Good",
+            "color": "#00e400",
+            "description": "Air quality is excellent",
+            "health_impact": "No health impacts expected",
+            "recommendations": ["Perfect for all outdoor activities", "Great for exercise", "Safe for everyone"]
+        },
+        {
+            "range": "51-100", 
+            "level": "Moderate",
+            "color": "#ffff00",
+            "description": "Air quality is acceptable",
+            "health_impact": "Minor symptoms possible for very sensitive people",
+            "recommendations": ["Generally safe for outdoor activities", "Sensitive individuals should monitor symptoms"]
+        },
+        {
+            "range": "101-150",
+            "level": "Unhealthy for Sensitive Groups",
+            "color": "#ff7e00",
+            "description": "Sensitive groups should take precautions",
+            "health_impact": "Increased symptoms for sensitive groups",
+            "recommendations": ["Sensitive individuals should wear masks", "Limit prolonged outdoor activities", "Use air purifiers"]
+        },
+        {
+            "range": "151-200",
+            "level": "Unhealthy", 
+            "color": "#ff0000",
+            "description": "Everyone should take precautions",
+            "health_impact": "Health effects possible for everyone",
+            "recommendations": ["Wear N95 masks outdoors", "Stay indoors when possible", "Avoid outdoor exercise"]
+        },
+        {
+            "range": "201-300",
+            "level": "Very Unhealthy",
+            "color": "#8f3f97",
+            "description": "Health alert for everyone",
+            "health_impact": "Serious health effects for everyone",
+            "recommendations": ["Emergency precautions", "Stay indoors", "Seek medical attention if symptomatic"]
+        },
+        {
+            "range": "301+",
+            "level": "Hazardous",
+            "color": "#7e0023", 
+            "description": "Health emergency",
+            "health_impact": "Life-threatening conditions",
+            "recommendations": ["Emergency conditions", "Avoid all outdoor exposure", "Immediate medical attention if needed"]
+        }
+    ],
+    "sources": ["EPA Air Quality Standards", "WHO Air Quality Guidelines"],
+    "last_updated": _iso_now()  # Static table, so this is the startup time
+}
+_AQI_REFERENCE_JSON = orjson.dumps(_AQI_REFERENCE)
 
 @app.get("/aqi/reference")
 async def get_aqi_reference():
     """Get AQI reference table with all categories and recommendations"""
-    return {
-        "categories": [
-            {
-                "range": "0-50",
-                "level": "Good",
-                "color": "#00e400",
-                "description": "Air quality is excellent",
-                "health_impact": "No health impacts expected",
-                "recommendations": ["Perfect for all outdoor activities", "Great for exercise", "Safe for everyone"]
-            },
-            {
-                "range": "51-100", 
-                "level": "Moderate",
-                "color": "#ffff00",
-                "description": "Air quality is acceptable",
-                "health_impact": "Minor symptoms possible for very sensitive people",
-                "recommendations": ["Generally safe for outdoor activities", "Sensitive individuals should monitor symptoms"]
-            },
-            {
-                "range": "101-150",
-                "level": "Unhealthy for Sensitive Groups",
-                "color": "#ff7e00",
-                "description": "Sensitive groups should take precautions",
-                "health_impact": "Increased symptoms for sensitive groups",
-                "recommendations": ["Sensitive individuals should wear masks", "Limit prolonged outdoor activities", "Use air purifiers"]
-            },
-            {
-                "range": "151-200",
-                "level": "Unhealthy", 
-                "color": "#ff0000",
-                "description": "Everyone should take precautions",
-                "health_impact": "Health effects possible for everyone",
-                "recommendations": ["Wear N95 masks outdoors", "Stay indoors when possible", "Avoid outdoor exercise"]
-            },
-            {
-                "range": "201-300",
-                "level": "Very Unhealthy",
-                "color": "#8f3f97",
-                "description": "Health alert for everyone",
-                "health_impact": "Serious health effects for everyone",
-                "recommendations": ["Emergency precautions", "Stay indoors", "Seek medical attention if symptomatic"]
-            },
-            {
-                "range": "301+",
-                "level": "Hazardous",
-                "color": "#7e0023", 
-                "description": "Health emergency",
-                "health_impact": "Life-threatening conditions",
-                "recommendations": ["Emergency conditions", "Avoid all outdoor exposure", "Immediate medical attention if needed"]
-            }
-        ],
-        "sources": ["EPA Air Quality Standards", "WHO Air Quality Guidelines"],
-        "last_updated": datetime.utcnow().isoformat()
-    }
+    return Response(content=_AQI_REFERENCE_JSON, media_type="application/json")
 
-def get_aqi_category(aqi: int) -> str:
-    """Convert AQI value to EPA category"""
-    if aqi <= 50:
-        return "Good"
-    elif aqi <= 100:
-        return "Moderate"
-    elif aqi <= 150:
-        return "Unhealthy for Sensitive Groups"
-    elif aqi <= 200:
-        return "Unhealthy"
-    elif aqi <= 300:
-        return "Very Unhealthy"
-    else:
-        return "Hazardous"
+# Starting factor and hourly drift of the weather influence, per dispersion label
+_WEATHER_TREND = {
+    "good_dispersion": (0.9, -0.01),  # Improves over time
+    "poor_dispersion": (1.1, 0.01),  # Worsens over time
+    "cleansing": (0.8, 0.02)  # Improves then gradually returns
+}
 
 def generate_realistic_forecast(lat: float, lon: float, current_aqi: int, current_pm25: float, 
-                               horizon: int, real_time_data: dict) -> list:
+                               horizon: int, real_time_data: dict, start_ns: Optional[int] = None) -> List[ForecastEntry]:
     """Generate realistic forecast based on real current conditions"""
-    forecast_data = []
-    
     # Extract weather influence
     weather_data = real_time_data.get("weather_data", {})
     weather_impact = weather_data.get("air_quality_impact", "moderate")
     wind_speed = weather_data.get("wind_speed", 5)
     
-    for i in range(horizon):
-        # Time-based adjustments
-        hour_of_day = (datetime.utcnow().hour + i) % 24
-        
-        # Daily pattern adjustments
-        daily_factor = 1.0
-        if 7 <= hour_of_day <= 9 or 17 <= hour_of_day <= 19:  # Rush hours
-            daily_factor = 1.2
-        elif 22 <= hour_of_day or hour_of_day <= 5:  # Night
-            daily_factor = 0.8
-        elif 10 <= hour_of_day <= 16:  # Midday photochemical activity
-            daily_factor = 1.1
-        
-        # Weather influence over time
-        weather_factor = 1.0
-        if weather_impact == "good_dispersion":
-            weather_factor = 0.9 - (i * 0.01)  # Improves over time
-        elif weather_impact == "poor_dispersion":
-            weather_factor = 1.1 + (i * 0.01)  # Worsens over time
-        elif weather_impact == "cleansing":
-            weather_factor = 0.8 + (i * 0.02)  # Improves then gradually returns
-        
-        # Calculate forecasted AQI
-        forecasted_aqi = current_aqi * daily_factor * weather_factor
-        forecasted_aqi = max(5, min(300, int(forecasted_aqi)))
-        
-        # Calculate PM2.5 based on AQI
-        forecasted_pm25 = max(0, current_pm25 * daily_factor * weather_factor)
-        
-        # Uncertainty increases with time
-        uncertainty = 10 + (i * 2)
-        lower_bound = max(0, forecasted_aqi - uncertainty)
-        upper_bound = min(500, forecasted_aqi + uncertainty)
-        
-        forecast_entry = {
-            "hour": i,
-            "timestamp": (datetime.utcnow() + timedelta(hours=i)).isoformat(),
-            "aqi": forecasted_aqi,
-            "aqi_lower": int(lower_bound),
-            "aqi_upper": int(upper_bound),
-            "pm25": round(forecasted_pm25, 1),
-            "category": get_aqi_category(forecasted_aqi)
+    if start_ns is None:
+        start_ns = time.time_ns()
+    hours = np.arange(horizon)
+    hour_of_day = (start_ns // NS_PER_HOUR + hours) % 24
+    
+    # Daily pattern adjustments
+    daily_factor = np.ones(horizon)
+    daily_factor[((hour_of_day >= 7) & (hour_of_day <= 9)) | ((hour_of_day >= 17) & (hour_of_day <= 19))] = 1.2  # Rush hours
+    daily_factor[(hour_of_day >= 22) | (hour_of_day <= 5)] = 0.8  # Night
+    daily_factor[(hour_of_day >= 10) & (hour_of_day <= 16)] = 1.1  # Midday photochemical activity
+    
+    # Weather influence over time
+    base, slope = _WEATHER_TREND.get(weather_impact, (1.0, 0.0))
+    weather_factor = base + hours * slope
+    
+    # Calculate forecasted AQI and PM2.5
+    forecasted_aqi = np.clip((current_aqi * daily_factor * weather_factor).astype(int), 5, 300)
+    forecasted_pm25 = np.maximum(0, current_pm25 * daily_factor * weather_factor)
+    
+    # Uncertainty increases with time
+    uncertainty = 10 + hours * 2
+    lower_bound = np.maximum(0, forecasted_aqi - uncertainty)
+    upper_bound = np.minimum(500, forecasted_aqi + uncertainty)
+    
+    forecast_data = [
+        ForecastEntry(
+            hour=i,
+            timestamp=_iso_from_ns(start_ns + i * NS_PER_HOUR),
+            aqi=aqi,
+            aqi_lower=lower,
+            aqi_upper=upper,
+            pm25=round(pm25, 1),
+            category=get_aqi_category(aqi)
+        )
+        for i, aqi, lower, upper, pm25 in zip(
+            range(horizon), forecasted_aqi.tolist(), lower_bound.tolist(),
+            upper_bound.tolist(), forecasted_pm25.tolist()
+        )
+    ]
+    
+    # Add health recommendations for current hour
+    if forecast_data:
+        forecast_data[0].health_recommendations = get_health_recommendations(forecast_data[0].aqi)
+        forecast_data[0].real_time_sources = {
+            "satellite_data": real_time_data.get("data_sources", {}).get("satellite", False),
+            "ground_sensors": real_time_data.get("data_sources", {}).get("ground_sensors", False),
+            "weather_data": real_time_data.get("data_sources", {}).get("weather", False)
         }
-        
-        # Add health recommendations for current hour
-        if i == 0:
-            forecast_entry["health_recommendations"] = get_health_recommendations(forecasted_aqi)
-            forecast_entry["real_time_sources"] = {
-                "satellite_data": real_time_data.get("data_sources", {}).get("satellite", False),
-                "ground_sensors": real_time_data.get("data_sources", {}).get("ground_sensors", False),
-                "weather_data": real_time_data.get("data_sources", {}).get("weather", False)
-            }
-        
-        forecast_data.append(forecast_entry)
     
     return forecast_data
 
 def generate_mock_forecast(lat: float, lon: float, horizon: int) -> dict:
     """Generate mock forecast data (fallback)"""
     # Use location to seed random data (so same location gives consistent results)
-    location_seed = int(hashlib.md5(f"{lat:.2f},{lon:.2f}".encode()).hexdigest()[:8], 16)
+    location_seed = zlib.crc32(f"{lat:.2f},{lon:.2f}".encode())
     random.seed(location_seed)
     
     # Generate location-based base AQI (varies by geography)
@@ -388,6 +441,7 @@ def generate_mock_forecast(lat: float, lon: float, horizon: int) -> dict:
     base_aqi += random.randint(-15, 15)  # Add some randomness
     base_aqi = max(10, min(200, base_aqi))  # Keep in reasonable range
     
+    start_ns = time.time_ns()
     forecast_data = []
     
     for i in range(horizon):
@@ -413,7 +467,7 @@ def generate_mock_forecast(lat: float, lon: float, horizon: int) -> dict:
         
         forecast_data.append({
             "hour": i,
-            "timestamp": (datetime.utcnow() + timedelta(hours=i)).isoformat(),
+            "timestamp": _iso_from_ns(start_ns + i * NS_PER_HOUR),
             "aqi": aqi,
             "aqi_lower": lower_bound,
             "aqi_upper": upper_bound,
@@ -427,103 +481,120 @@ def generate_mock_forecast(lat: float, lon: float, horizon: int) -> dict:
         "lon": lon,
         "forecast": forecast_data,
         "model": "mock_data_fallback",
-        "generated_at": datetime.utcnow().isoformat()
+        "generated_at": _iso_from_ns(start_ns)
     }
 
-def get_health_recommendations(aqi: int) -> dict:
+# Health recommendations per AQI category, in _AQI_BOUNDS order; read-only since every response shares them
+_HEALTH_RECS = tuple(MappingProxyType(rec) for rec in (
+    # Good
+    {
+        "level": "Good",
+        "message": "Air quality is excellent! Perfect for all outdoor activities.",
+        "recommendations": (
+            "🚴‍♂️ Great time for outdoor exercise and activities",
+            "🌳 Enjoy walks in parks and nature",
+            "🏃‍♀️ Perfect for jogging and running",
+            "👶 Safe for children to play outside"
+        ),
+        "sensitive_groups": "No precautions needed for any group",
+        "mask_needed": False,
+        "outdoor_activities": "Highly recommended"
+    },
+    # Moderate
+    {
+        "level": "Moderate",
+        "message": "Air quality is acceptable for most people.",
+        "recommendations": (
+            "🚶‍♂️ Outdoor activities are generally safe",
+            "👥 Sensitive individuals should consider reducing prolonged outdoor activities",
+            "🌅 Early morning and evening are best times for outdoor exercise",
+            "💨 Ensure good ventilation indoors"
+        ),
+        "sensitive_groups": "Sensitive individuals may experience minor symptoms",
+        "mask_needed": False,
+        "outdoor_activities": "Generally safe"
+    },
+    # Unhealthy for Sensitive Groups
+    {
+        "level": "Unhealthy for Sensitive Groups",
+        "message": "Sensitive groups should take precautions.",
+        "recommendations": (
+            "😷 Consider wearing masks for sensitive individuals",
+            "🏠 Limit prolonged outdoor activities for sensitive groups",
+            "🌬️ Use air purifiers indoors",
+            "⚡ Reduce outdoor exercise intensity",
+            "👴 Elderly and children should stay indoors when possible"
+        ),
+        "sensitive_groups": "Children, elderly, and people with heart/lung conditions should limit outdoor exposure",
+        "mask_needed": True,
+        "outdoor_activities": "Limited for sensitive groups"
+    },
+    # Unhealthy
+    {
+        "level": "Unhealthy",
+        "message": "Everyone should take precautions to limit exposure.",
+        "recommendations": (
+            "😷 Wear N95 or equivalent masks when outdoors",
+            "🏠 Stay indoors as much as possible",
+            "🚫 Avoid outdoor exercise and strenuous activities",
+            "🪟 Keep windows and doors closed",
+            "🌬️ Use HEPA air purifiers indoors",
+            "💊 Have medications ready if you have respiratory conditions"
+        ),
+        "sensitive_groups": "High risk - should avoid outdoor activities entirely",
+        "mask_needed": True,
+        "outdoor_activities": "Not recommended"
+    },
+    # Very Unhealthy
+    {
+        "level": "Very Unhealthy",
+        "message": "Health alert! Everyone should avoid outdoor activities.",
+        "recommendations": (
+            "🚨 Emergency precautions - stay indoors",
+            "😷 Wear N95/P100 masks if you must go outside",
+            "🏥 Seek medical attention if experiencing symptoms",
+            "🚫 Cancel all outdoor activities and events",
+            "🌬️ Use multiple air purifiers and seal windows",
+            "📞 Check on elderly neighbors and relatives"
+        ),
+        "sensitive_groups": "Emergency risk - seek immediate medical attention if experiencing symptoms",
+        "mask_needed": True,
+        "outdoor_activities": "Strongly discouraged"
+    },
+    # Hazardous (300+)
+    {
+        "level": "Hazardous",
+        "message": "Health emergency! Avoid all outdoor exposure.",
+        "recommendations": (
+            "🆘 Emergency conditions - stay indoors immediately",
+            "😷 N95/P100 masks required for any outdoor exposure",
+            "🏥 Seek immediate medical attention if experiencing any symptoms",
+            "📱 Monitor local emergency alerts",
+            "🌬️ Seal all air leaks and use professional air filtration",
+            "🚨 Consider evacuation if conditions persist"
+        ),
+        "sensitive_groups": "Life-threatening conditions - immediate medical attention may be required",
+        "mask_needed": True,
+        "outdoor_activities": "Prohibited"
+    }
+))
+
+def get_health_recommendations(aqi: int) -> Mapping[str, Any]:
     """Get health recommendations based on AQI level following international standards"""
-    if aqi <= 50:  # Good
-        return {
-            "level": "Good",
-            "message": "Air quality is excellent! Perfect for all outdoor activities.",
-            "recommendations": [
-                "🚴‍♂️ Great time for outdoor exercise and activities",
-                "🌳 Enjoy walks in parks and nature",
-                "🏃‍♀️ Perfect for jogging and running",
-                "👶 Safe for children to play outside"
-            ],
-            "sensitive_groups": "No precautions needed for any group",
-            "mask_needed": False,
-            "outdoor_activities": "Highly recommended"
-        }
-    elif aqi <= 100:  # Moderate
-        return {
-            "level": "Moderate",
-            "message": "Air quality is acceptable for most people.",
-            "recommendations": [
-                "🚶‍♂️ Outdoor activities are generally safe",
-                "👥 Sensitive individuals should consider reducing prolonged outdoor activities",
-                "🌅 Early morning and evening are best times for outdoor exercise",
-                "💨 Ensure good ventilation indoors"
-            ],
-            "sensitive_groups": "Sensitive individuals may experience minor symptoms",
-            "mask_needed": False,
-            "outdoor_activities": "Generally safe"
-        }
-    elif aqi <= 150:  # Unhealthy for Sensitive Groups
-        return {
-            "level": "Unhealthy for Sensitive Groups",
-            "message": "Sensitive groups should take precautions.",
-            "recommendations": [
-                "😷 Consider wearing masks for sensitive individuals",
-                "🏠 Limit prolonged outdoor activities for sensitive groups",
-                "🌬️ Use air purifiers indoors",
-                "⚡ Reduce outdoor exercise intensity",
-                "👴 Elderly and children should stay indoors when possible"
-            ],
-            "sensitive_groups": "Children, elderly, and people with heart/lung conditions should limit outdoor exposure",
-            "mask_needed": True,
-            "outdoor_activities": "Limited for sensitive groups"
-        }
-    elif aqi <= 200:  # Unhealthy
-        return {
-            "level": "Unhealthy",
-            "message": "Everyone should take precautions to limit exposure.",
-            "recommendations": [
-                "😷 Wear N95 or equivalent masks when outdoors",
-                "🏠 Stay indoors as much as possible",
-                "🚫 Avoid outdoor exercise and strenuous activities",
-                "🪟 Keep windows and doors closed",
-                "🌬️ Use HEPA air purifiers indoors",
-                "💊 Have medications ready if you have respiratory conditions"
-            ],
-            "sensitive_groups": "High risk - should avoid outdoor activities entirely",
-            "mask_needed": True,
-            "outdoor_activities": "Not recommended"
-        }
-    elif aqi <= 300:  # Very Unhealthy
-        return {
-            "level": "Very Unhealthy",
-            "message": "Health alert! Everyone should avoid outdoor activities.",
-            "recommendations": [
-                "🚨 Emergency precautions - stay indoors",
-                "😷 Wear N95/P100 masks if you must go outside",
-                "🏥 Seek medical attention if experiencing symptoms",
-                "🚫 Cancel all outdoor activities and events",
-                "🌬️ Use multiple air purifiers and seal windows",
-                "📞 Check on elderly neighbors and relatives"
-            ],
-            "sensitive_groups": "Emergency risk - seek immediate medical attention if experiencing symptoms",
-            "mask_needed": True,
-            "outdoor_activities": "Strongly discouraged"
-        }
-    else:  # Hazardous (300+)
-        return {
-            "level": "Hazardous",
-            "message": "Health emergency! Avoid all outdoor exposure.",
-            "recommendations": [
-                "🆘 Emergency conditions - stay indoors immediately",
-                "😷 N95/P100 masks required for any outdoor exposure",
-                "🏥 Seek immediate medical attention if experiencing any symptoms",
-                "📱 Monitor local emergency alerts",
-                "🌬️ Seal all air leaks and use professional air filtration",
-                "🚨 Consider evacuation if conditions persist"
-            ],
-            "sensitive_groups": "Life-threatening conditions - immediate medical attention may be required",
-            "mask_needed": True,
-            "outdoor_activities": "Prohibited"
-        }
+    return _HEALTH_RECS[bisect_left(_AQI_BOUNDS, aqi)]
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    workers = max(2, (os.cpu_count() or 1) // 2)
+    # Each worker has its own rate limiters; tell them how many ways to split the upstream quotas.
+    # This launcher runs a single instance, so its workers are all the processes there are
+    os.environ["API_WORKERS"] = str(workers)
+    # Workers need the import string; each one imports main and gets its own HTTP client
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=workers
+    )
\ No newline at end of file